@@ -45,7 +45,7 @@ def make_cat_matrices(n_rows: int, n_cat_cols_1: int, n_cat_cols_2: int) -> dict
         )
     }
     two_cat_matrices["scipy.sparse csr"] = sps.hstack(
-        [elt.tocsr() for elt in two_cat_matrices["tabmat"].matrices]
+        [elt.tocsr() for elt in two_cat_matrices["tabmat"].matrices], format="csr"
     )
     two_cat_matrices["scipy.sparse csc"] = two_cat_matrices[
         "scipy.sparse csr"
@@ -65,7 +65,8 @@ def make_dense_cat_matrices(
     dense_cat_matrices = {
         "tabmat": tm.SplitMatrix(two_cat_matrices + [tm.DenseMatrix(dense_block)]),
         "scipy.sparse csr": sps.hstack(
-            [elt.tocsr() for elt in two_cat_matrices] + [sps.csr_matrix(dense_block)]
+            [elt.tocsr() for elt in two_cat_matrices] + [sps.csr_matrix(dense_block)],
+            format="csr",
         ),
     }
     dense_cat_matrices["scipy.sparse csc"] = dense_cat_matrices[
@@ -159,8 +159,12 @@ This is `ext/split/sandwich_cat_dense`
         for j in range(Y.shape[1]):
             res[X.indices[k], j] += d[k] * Y[k, j]
 
+With a restriction to a subset of the columns of X, rows of ``res`` are only
+written for the selected categories, through a map from category to output row.
+
 """
 
+from copy import copy as shallow_copy
 from typing import Any, List, Optional, Tuple, Union
 
 import numpy as np
@@ -168,6 +172,7 @@ import pandas as pd
 from scipy import sparse as sps
 
 from .ext.categorical import (
+    csc_order,
     matvec,
     matvec_drop_first,
     multiply_drop_first,
@@ -177,7 +182,7 @@ from .ext.categorical import (
     transpose_matvec,
     transpose_matvec_drop_first,
 )
-from .ext.split import sandwich_cat_cat, sandwich_cat_dense
+from .ext.split import sandwich_cat_cat, sandwich_cat_dense, sandwich_cat_sparse
 from .matrix_base import MatrixBase
 from .sparse_matrix import SparseMatrix
 from .util import (
@@ -242,6 +247,10 @@ class CategoricalMatrix(MatrixBase):
 
     dtype:
         data type
+
+    categories:
+        If given, ``cat_vec`` is interpreted as integer codes into ``categories``.
+        This skips factorizing ``cat_vec`` when the data are already coded.
     """
 
     def __init__(
@@ -249,17 +258,30 @@ class CategoricalMatrix(MatrixBase):
         cat_vec: Union[List, np.ndarray, pd.Categorical],
         drop_first: bool = False,
         dtype: np.dtype = np.float64,
+        categories: Optional[Union[List, np.ndarray, pd.Index]] = None,
     ):
-        if pd.isnull(cat_vec).any():
-            raise ValueError("Categorical data can't have missing values.")
-
-        if isinstance(cat_vec, pd.Categorical):
-            self.cat = cat_vec
+        if categories is not None:
+            codes = np.asarray(cat_vec)
+            if not np.issubdtype(codes.dtype, np.integer):
+                raise ValueError(
+                    "If categories are provided, cat_vec must contain integer codes."
+                )
+            if (codes < 0).any():
+                raise ValueError("Categorical data can't have missing values.")
+            self.cat = pd.Categorical.from_codes(codes, categories)
         else:
-            self.cat = pd.Categorical(cat_vec)
+            if pd.isnull(cat_vec).any():
+                raise ValueError("Categorical data can't have missing values.")
+
+            if isinstance(cat_vec, pd.Categorical):
+                self.cat = cat_vec
+            else:
+                self.cat = pd.Categorical(cat_vec)
 
         self.drop_first = drop_first
         self.shape = (len(self.cat), len(self.cat.categories) - int(drop_first))
+        # The extensions take the codes as C ints. Casting once here (which also
+        # gives a writeable, contiguous copy) avoids conversions on every call.
         self.indices = self.cat.codes.astype(np.int32)
         self.x_csc: Optional[Tuple[Optional[np.ndarray], np.ndarray, np.ndarray]] = None
         self.dtype = np.dtype(dtype)
@@ -270,7 +292,7 @@ class CategoricalMatrix(MatrixBase):
 
         Test: matrix/test_categorical_matrix::test_recover_orig
         """
-        return self.cat.categories[self.cat.codes]
+        return np.asarray(self.cat)
 
     def _matvec_setup(
         self,
@@ -278,9 +300,9 @@ class CategoricalMatrix(MatrixBase):
         cols: np.ndarray = None,
     ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
         other = np.asarray(other)
-        if other.ndim > 1:
+        if other.ndim > 2:
             raise NotImplementedError(
-                """CategoricalMatrix.matvec is only implemented for 1d arrays."""
+                """CategoricalMatrix.matvec is only implemented for 1d and 2d arrays."""
             )
         if other.shape[0] != self.shape[1]:
             raise ValueError(
@@ -310,6 +332,9 @@ class CategoricalMatrix(MatrixBase):
 
         out[i] += sum_j mat[i, j] other[j] = other[mat.indices[i]]
 
+        If 'other' is 2d, every column of 'other' is multiplied at once by
+        gathering the rows ``other[mat.indices[i], :]``.
+
         The cols parameter allows restricting to a subset of the
         matrix without making a copy.
 
@@ -327,15 +352,32 @@ class CategoricalMatrix(MatrixBase):
         else:
             other_m = other
 
-        if out is None:
-            out = np.zeros(self.shape[0], dtype=other_m.dtype)
-
-        if self.drop_first:
-            matvec_drop_first(
-                self.indices, other_m, self.shape[0], cols, self.shape[1], out
+        if other_m.ndim == 2:
+            # Zero rows stand in for the dropped reference category and for
+            # columns excluded by 'cols', so a single gather gives the result.
+            lookup = np.zeros(
+                (self.shape[1] + self.drop_first, other_m.shape[1]),
+                dtype=other_m.dtype,
             )
+            if cols is None:
+                lookup[self.drop_first :] = other_m
+            else:
+                lookup[cols + self.drop_first] = other_m[cols]
+            res = lookup.take(self.indices, axis=0)
+            if out is None:
+                out = res
+            else:
+                out += res
         else:
-            matvec(self.indices, other_m, self.shape[0], cols, self.shape[1], out)
+            if out is None:
+                out = np.zeros(self.shape[0], dtype=other_m.dtype)
+
+            if self.drop_first:
+                matvec_drop_first(
+                    self.indices, other_m, self.shape[0], cols, self.shape[1], out
+                )
+            else:
+                matvec(self.indices, other_m, self.shape[0], cols, self.shape[1], out)
 
         if is_int:
             return out.astype(int)
@@ -385,11 +427,14 @@ class CategoricalMatrix(MatrixBase):
                 "CategoricalMatrix.transpose_matvec is only implemented for 1d arrays."
             )
 
+        # The kernels require vec and out to have the same dtype.
         out_is_none = out is None
-        if out_is_none:
+        if out is None:
             out = np.zeros(self.shape[1], dtype=self.dtype)
+            vec = vec.astype(self.dtype, copy=False)
         else:
             check_transpose_matvec_out_shape(self, out)
+            vec = vec.astype(out.dtype, copy=False)
 
         if rows is not None:
             rows = set_up_rows_or_cols(rows, self.shape[0])
@@ -430,7 +475,22 @@ class CategoricalMatrix(MatrixBase):
         The rows and cols parameters allow restricting to a subset of the
         matrix without making a copy.
         """
-        d = np.asarray(d)
+        return sps.diags(self._sandwich_diag(d, rows, cols))
+
+    def _sandwich_diag(
+        self,
+        d: Union[np.ndarray, List],
+        rows: np.ndarray = None,
+        cols: np.ndarray = None,
+    ) -> np.ndarray:
+        """
+        Return the diagonal of the sandwich product as a 1d array.
+
+        Callers that add the result into a dense array use this directly rather
+        than going through the ``dia_matrix`` returned by ``sandwich``.
+        """
+        # The extension reads d through a raw pointer.
+        d = np.ascontiguousarray(d)
         rows = set_up_rows_or_cols(rows, self.shape[0])
         if self.drop_first:
             res_diag = sandwich_categorical_drop_first(
@@ -443,7 +503,7 @@ class CategoricalMatrix(MatrixBase):
 
         if cols is not None and len(cols) < self.shape[1]:
             res_diag = res_diag[cols]
-        return sps.diags(res_diag)
+        return res_diag
 
     def _cross_sandwich(
         self,
@@ -467,8 +527,42 @@ class CategoricalMatrix(MatrixBase):
     def getcol(self, i: int) -> sps.csc_matrix:
         """Return matrix column at specified index."""
         i %= self.shape[1]  # wrap-around indexing
-        col_i = sps.csc_matrix((self.indices == i).astype(int)[:, None])
-        return col_i
+        if self.x_csc is not None:
+            _, indices, indptr = self.x_csc
+            col_rows = indices[indptr[i] : indptr[i + 1]]
+        else:
+            # Don't build the whole csc structure for a single column.
+            col_rows = np.flatnonzero(self.indices == i + self.drop_first).astype(
+                np.int32
+            )
+        return sps.csc_matrix(
+            (
+                np.ones(len(col_rows), dtype=int),
+                col_rows,
+                np.array([0, len(col_rows)], dtype=np.int32),
+            ),
+            shape=(self.shape[0], 1),
+        )
+
+    def _check_csc(self) -> Tuple[Optional[np.ndarray], np.ndarray, np.ndarray]:
+        """
+        Return the (data, indices, indptr) of the csc representation, building it once.
+
+        Since every nonzero is a one, ``data`` is not stored and is always ``None``.
+        The cumulative counts of each category give ``indptr``, and a counting sort
+        of ``self.indices`` gives the row indices sorted by column.
+        """
+        if self.x_csc is None:
+            n_cats = self.shape[1] + self.drop_first
+            indptr = np.zeros(n_cats + 1, dtype=np.int32)
+            np.cumsum(np.bincount(self.indices, minlength=n_cats), out=indptr[1:])
+            order = csc_order(self.indices, indptr)
+            if self.drop_first:
+                # rows of the reference category come first; skip them
+                order = order[indptr[1] :]
+                indptr = indptr[1:] - indptr[1]
+            self.x_csc = (None, order, indptr)
+        return self.x_csc
 
     def tocsr(self) -> sps.csr_matrix:
         """Return scipy csr representation of matrix."""
@@ -483,18 +577,41 @@ class CategoricalMatrix(MatrixBase):
         # TODO: data should be uint8
         data = np.ones(self.shape[0], dtype=int)
         return sps.csr_matrix(
-            (data, self.indices, np.arange(self.shape[0] + 1, dtype=int)),
+            (data, self.indices, np.arange(self.shape[0] + 1, dtype=np.int32)),
             shape=self.shape,
         )
 
+    def tocsc(self) -> sps.csc_matrix:
+        """Return scipy csc representation of matrix."""
+        _, indices, indptr = self._check_csc()
+        return sps.csc_matrix(
+            (np.ones(len(indices), dtype=int), indices, indptr), shape=self.shape
+        )
+
     def toarray(self) -> np.ndarray:
         """Return array representation of matrix."""
-        return self.tocsr().A
+        # Write the ones directly instead of going through a csr matrix.
+        out = np.zeros(self.shape, dtype=self.dtype)
+        if self.drop_first:
+            rows = np.flatnonzero(self.indices)
+            out[rows, self.indices[rows] - 1] = 1
+        else:
+            out[np.arange(self.shape[0]), self.indices] = 1
+        return out
 
     def astype(self, dtype, order="K", casting="unsafe", copy=True):
-        """Return CategoricalMatrix cast to new type."""
-        self.dtype = dtype
-        return self
+        """
+        Return CategoricalMatrix cast to new type.
+
+        Only the dtype used for results changes, so the copy shares the
+        (read-only in practice) category codes with the original.
+        """
+        if copy:
+            new = shallow_copy(self)
+        else:
+            new = self
+        new.dtype = np.dtype(dtype)
+        return new
 
     def _get_col_stds(self, weights: np.ndarray, col_means: np.ndarray) -> np.ndarray:
         """Get standard deviations of columns."""
@@ -502,29 +619,60 @@ class CategoricalMatrix(MatrixBase):
         # sum_i X_ij^2 w_i
         # but because X_ij is either {0, 1}
         # we don't actually need to square.
-        mean = self.transpose_matvec(weights)
-        return np.sqrt(mean - col_means ** 2)
+        # transpose_matvec returns a new array, so we can work in place on it.
+        sqrt_arg = self.transpose_matvec(weights)
+        sqrt_arg -= np.square(col_means)
+        return np.sqrt(sqrt_arg, out=sqrt_arg)
 
     def __getitem__(self, item):
         if isinstance(item, tuple):
             row, col = item
-            if _is_indexer_full_length(self.shape[1], col):
-                if isinstance(row, int):
-                    row = [row]
-                return CategoricalMatrix(
-                    self.cat[row], drop_first=self.drop_first, dtype=self.dtype
-                )
-            else:
+            if not _is_indexer_full_length(self.shape[1], col):
                 # return a SparseMatrix if we subset columns
                 # TODO: this is inefficient. See issue #101.
-                return SparseMatrix(self.tocsr()[row, col], dtype=self.dtype)
+                return SparseMatrix(self.tocsc()[row, col], dtype=self.dtype)
         else:
             row = item
         if isinstance(row, int):
             row = [row]
-        return CategoricalMatrix(
-            self.cat[row], drop_first=self.drop_first, dtype=self.dtype
+        return self._subset_rows(row)
+
+    def _subset_rows(self, row) -> "CategoricalMatrix":
+        """
+        Return a CategoricalMatrix restricted to the given rows.
+
+        The categories are unchanged, so the codes of the subset can be reused
+        instead of going through ``__init__`` again. The rows are only gathered
+        once, from ``self.cat``, whose codes are usually narrower than int32.
+        """
+        new = shallow_copy(self)
+        new.cat = self.cat[row]
+        new.indices = new.cat.codes.astype(np.int32)
+        new.shape = (len(new.indices), self.shape[1])
+        new.x_csc = None
+        return new
+
+    def _get_col_map(
+        self, L_cols: Optional[np.ndarray]
+    ) -> Tuple[np.ndarray, int, Optional[np.ndarray]]:
+        """
+        Map each category to its row in the output of a cross sandwich product.
+
+        The kernels only accumulate into the selected columns. Categories that
+        are not selected, and the reference category when dropping the first
+        column, are mapped to -1 (skipped). A category can only map to one row,
+        so repeated columns are computed once and expanded afterwards with the
+        returned inverse index (``None`` if there are no repeats).
+        """
+        L_cols = set_up_rows_or_cols(L_cols, self.shape[1])
+        unique_cols, inverse = np.unique(L_cols, return_inverse=True)
+        if len(unique_cols) == len(L_cols):
+            unique_cols, inverse = L_cols, None
+        i_col_map = np.full(self.shape[1] + self.drop_first, -1, dtype=np.int32)
+        i_col_map[unique_cols + self.drop_first] = np.arange(
+            len(unique_cols), dtype=np.int32
         )
+        return i_col_map, len(unique_cols), inverse
 
     def _cross_dense(
         self,
@@ -545,18 +693,20 @@ class CategoricalMatrix(MatrixBase):
             )
 
         rows, R_cols = setup_restrictions((self.shape[0], other.shape[1]), rows, R_cols)
+        i_col_map, i_ncol, inverse = self._get_col_map(L_cols)
 
         res = sandwich_cat_dense(
             self.indices,
-            self.shape[1] + self.drop_first,
+            i_col_map,
+            i_ncol,
             d,
             other,
             rows,
             R_cols,
             is_c_contiguous,
         )
-
-        res = _row_col_indexing(res[self.drop_first :], L_cols, None)
+        if inverse is not None:
+            res = res[inverse]
         return res
 
     def _cross_categorical(
@@ -597,11 +747,34 @@ class CategoricalMatrix(MatrixBase):
         L_cols: Optional[np.ndarray],
         R_cols: Optional[np.ndarray],
     ) -> np.ndarray:
-        term_1 = self * d  # multiply will deal with drop_first
-
-        term_1 = _row_col_indexing(term_1, rows, L_cols)
+        # Since each row of self has exactly one nonzero, every nonzero
+        # other[k, j] contributes d[k] * other[k, j] to res[indices[k], j]. The
+        # kernel walks the selected csc columns of other once, without building
+        # (and slicing) a csr representation of self.
+        i_col_map, i_ncol, inverse = self._get_col_map(L_cols)
+        R_cols = set_up_rows_or_cols(R_cols, other.shape[1])
+        dtype = np.result_type(d.dtype, other.dtype, np.float32)
+        if rows is None:
+            d = np.ascontiguousarray(d, dtype=dtype)
+        else:
+            # Zero out d outside of rows (counting repeated rows) so that the
+            # kernel does not need to check the row of each nonzero.
+            rows = set_up_rows_or_cols(rows, self.shape[0])
+            d = np.bincount(rows, weights=d[rows], minlength=self.shape[0])
+            d = d.astype(dtype, copy=False)
 
-        res = term_1.T.dot(_row_col_indexing(other, rows, R_cols)).A
+        res = sandwich_cat_sparse(
+            self.indices,
+            i_col_map,
+            i_ncol,
+            d,
+            other.data.astype(dtype, copy=False),
+            other.indices,
+            other.indptr,
+            R_cols,
+        )
+        if inverse is not None:
+            res = res[inverse]
         return res
 
     def multiply(self, other) -> sps.csr_matrix:
@@ -623,7 +796,11 @@ class CategoricalMatrix(MatrixBase):
             )
 
         return sps.csr_matrix(
-            (np.squeeze(other), self.indices, np.arange(self.shape[0] + 1, dtype=int)),
+            (
+                np.squeeze(other),
+                self.indices,
+                np.arange(self.shape[0] + 1, dtype=np.int32),
+            ),
             shape=self.shape,
         )
 
@@ -16,6 +16,8 @@ from libcpp cimport bool
 cdef extern from "cat_split_helpers.cpp":
     void _transpose_matvec_all_rows[F](int, int*, F*, F*, int)
     void _transpose_matvec_all_rows_drop_first[F](int, int*, F*, F*, int)
+    void _sandwich_categorical_complete[F](const int*, F*, int*, int, F*, int)
+    void _sandwich_categorical_drop_first[F](const int*, F*, int*, int, F*, int)
 
 
 def transpose_matvec(
@@ -29,7 +31,8 @@ def transpose_matvec(
 ):
     cdef int row, row_idx, n_keep_rows, col
     cdef int n_rows = len(indices)
-    cdef int[:] rows_view, cols_view, cols_included
+    cdef int[:] rows_view, cols_view
+    cdef uint8[:] cols_included
 
     cdef bool no_row_restrictions = rows is None or len(rows) == n_rows
     cdef bool no_col_restrictions = cols is None or len(cols) == n_cols
@@ -76,7 +79,8 @@ def transpose_matvec_drop_first(
 ):
     cdef int row, row_idx, n_keep_rows, col_idx
     cdef int n_rows = len(indices)
-    cdef int[:] rows_view, cols_view, cols_included
+    cdef int[:] rows_view, cols_view
+    cdef uint8[:] cols_included
 
     cdef bool no_row_restrictions = rows is None or len(rows) == n_rows
     cdef bool no_col_restrictions = cols is None or len(cols) == n_cols
@@ -115,8 +119,9 @@ def transpose_matvec_drop_first(
 
 
 def get_col_included(int[:] cols, int n_cols):
-    cdef int[:] col_included = np.zeros(n_cols, dtype=np.int32)
+    cdef uint8[:] col_included = np.zeros(n_cols, dtype=np.uint8)
     cdef int n_cols_included = len(cols)
+    cdef int Ci
     for Ci in range(n_cols_included):
         col_included[cols[Ci]] = 1
     return col_included
@@ -134,7 +139,7 @@ def matvec(
     this is equivalent to `other[cat_index]`.
     """
     cdef int i, col_idx, Ci, k
-    cdef int[:] col_included
+    cdef uint8[:] col_included
 
     if cols is None:
         for i in prange(n_rows, nogil=True):
@@ -160,7 +165,7 @@ def matvec_drop_first(
     CategoricalMatrix so the indices refer to the column index + 1.
     """
     cdef int i, col_idx, Ci, k
-    cdef int[:] col_included
+    cdef uint8[:] col_included
 
     if cols is None:
         for i in prange(n_rows, nogil=True):
@@ -177,39 +182,39 @@ def matvec_drop_first(
 
 
 def sandwich_categorical(
-    const int[:] indices,
-    floating[:] d,
-    int[:] rows,
+    const int[::1] indices,
+    floating[::1] d,
+    int[::1] rows,
     dtype,
     int n_cols
 ):
     cdef floating[:] res = np.zeros(n_cols, dtype=dtype)
-    cdef int col_idx, k, k_idx
     cdef int n_rows = len(rows)
 
-    for k_idx in range(n_rows):
-        k = rows[k_idx]
-        col_idx = indices[k]
-        res[col_idx] += d[k]
+    if n_rows == 0 or n_cols == 0:
+        return np.asarray(res)
+
+    _sandwich_categorical_complete(&indices[0], &d[0], &rows[0], n_rows, &res[0], n_cols)
     return np.asarray(res)
 
 
 def sandwich_categorical_drop_first(
-    const int[:] indices,
-    floating[:] d,
-    int[:] rows,
+    const int[::1] indices,
+    floating[::1] d,
+    int[::1] rows,
     dtype,
     int n_cols
 ):
     cdef floating[:] res = np.zeros(n_cols, dtype=dtype)
-    cdef int col_idx, k, k_idx
     cdef int n_rows = len(rows)
 
-    for k_idx in range(n_rows):
-        k = rows[k_idx]
-        col_idx = indices[k] - 1  # reference category is always 0.
-        if col_idx != -1:
-            res[col_idx] += d[k]
+    if n_rows == 0 or n_cols == 0:
+        return np.asarray(res)
+
+    # reference category is always 0 and is skipped in the kernel.
+    _sandwich_categorical_drop_first(
+        &indices[0], &d[0], &rows[0], n_rows, &res[0], n_cols
+    )
     return np.asarray(res)
 
 
@@ -309,3 +314,37 @@ def subset_categorical_drop_first(
     vnew_indptr[i+1] = nonzero_cnt
 
     return nonzero_cnt, new_indices[:nonzero_cnt], new_indptr
+
+
+def csc_order(
+    const int[::1] indices,
+    const int[::1] indptr,
+):
+    """Sort the rows of a CategoricalMatrix by category with a counting sort.
+
+    Parameters
+    ----------
+    indices:
+        The vector of categories
+    indptr:
+        Start of each category in the output, i.e. the cumulative counts of
+        the categories
+
+    Returns
+    -------
+    Row indices sorted by category, stable within each category.
+    """
+    cdef:
+        int nrows = len(indices)
+        Py_ssize_t i
+        int cat
+        np.ndarray order = np.empty(nrows, dtype=np.int32)
+        int[:] vorder = order
+        int[:] vpos = np.array(indptr[:-1], dtype=np.int32)
+
+    for i in range(nrows):
+        cat = indices[i]
+        vorder[vpos[cat]] = i
+        vpos[cat] += 1
+
+    return order
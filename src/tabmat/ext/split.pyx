@@ -22,13 +22,15 @@ ctypedef fused win_integral:
 
 
 cdef extern from "cat_split_helpers.cpp":
-    void _sandwich_cat_denseC[F](F*, int*, int*, int, int*, int, F*, int, F*, int, int) nogil
-    void _sandwich_cat_denseF[F](F*, int*, int*, int, int*, int, F*, int, F*, int, int) nogil
+    void _sandwich_cat_denseC[F](F*, int*, int*, int*, int, int*, int, F*, int, F*, int, int) nogil
+    void _sandwich_cat_denseF[F](F*, int*, int*, int*, int, int*, int, F*, int, F*, int, int) nogil
     void _sandwich_cat_cat[F](F*, const int*, const int*, int*, int, F*, int, int, bool, bool)
+    void _sandwich_cat_sparse[Int, F](F*, const int*, const int*, F*, Int*, Int*, const int*, int, F*, int) nogil
 
 
 def sandwich_cat_dense(
     int[:] i_indices,
+    int[:] i_col_map,
     int i_ncol,
     floating[:] d,
     np.ndarray mat_j,
@@ -36,6 +38,13 @@ def sandwich_cat_dense(
     int[:] j_cols,
     bool is_c_contiguous
 ):
+    """
+    (X1.T @ diag(d) @ X2)[i_col_map[c], j] = sum_{k: X1 indices[k] = c} d[k] X2[k, j]
+
+    i_col_map maps each category of X1 to a row of the output, or to -1 if the
+    category is not included (e.g. because it is dropped or not in the selected
+    columns). i_ncol is the number of output rows.
+    """
 
     cdef floating[:, :] res
     res = np.zeros((i_ncol, len(j_cols)), dtype=mat_j.dtype)
@@ -45,23 +54,57 @@ def sandwich_cat_dense(
 
     cdef floating* d_p = &d[0]
     cdef int* i_indices_p = &i_indices[0]
+    cdef int* i_col_map_p = &i_col_map[0]
     cdef int* rows_p = &rows[0]
     cdef int* j_cols_p = &j_cols[0]
 
     cdef floating* mat_j_p = <floating*>mat_j.data
 
     if is_c_contiguous:
-        _sandwich_cat_denseC(d_p, i_indices_p, rows_p, len(rows), j_cols_p,
-                            len(j_cols), &res[0, 0], res.size, mat_j_p,
+        _sandwich_cat_denseC(d_p, i_indices_p, i_col_map_p, rows_p, len(rows),
+                            j_cols_p, len(j_cols), &res[0, 0], res.size, mat_j_p,
                             mat_j.shape[0], mat_j.shape[1])
     else:
-        _sandwich_cat_denseF(d_p, i_indices_p, rows_p, len(rows), j_cols_p,
-                            len(j_cols), &res[0, 0], res.size, mat_j_p,
+        _sandwich_cat_denseF(d_p, i_indices_p, i_col_map_p, rows_p, len(rows),
+                            j_cols_p, len(j_cols), &res[0, 0], res.size, mat_j_p,
                             mat_j.shape[0], mat_j.shape[1])
 
     return np.asarray(res)
 
 
+def sandwich_cat_sparse(
+    const int[::1] i_indices,
+    const int[::1] i_col_map,
+    int i_ncol,
+    const floating[::1] d,
+    const floating[::1] data,
+    const win_integral[::1] indices,
+    const win_integral[::1] indptr,
+    const int[::1] j_cols,
+):
+    """
+    (X1.T @ diag(d) @ X2)[i_col_map[c], j] = sum_{k: X1 indices[k] = c} d[k] X2[k, j]
+
+    X2 is a csc matrix given by data, indices and indptr. Each nonzero of the
+    selected columns of X2 is visited once. The result is Fortran-ordered.
+    """
+    dtype = np.float64 if floating is double else np.float32
+    cdef floating[:, ::1] res_t = np.zeros((len(j_cols), i_ncol), dtype=dtype)
+
+    if len(j_cols) == 0 or i_ncol == 0 or len(data) == 0:
+        return np.asarray(res_t).T
+
+    # The kernel doesn't write to its inputs; the casts only drop the const
+    # qualifier so that Cython can deduce the template parameters.
+    with nogil:
+        _sandwich_cat_sparse(<floating*>&d[0], &i_indices[0], &i_col_map[0],
+                             <floating*>&data[0], <win_integral*>&indices[0],
+                             <win_integral*>&indptr[0], &j_cols[0], len(j_cols),
+                             &res_t[0, 0], i_ncol)
+
+    return np.asarray(res_t).T
+
+
 def sandwich_cat_cat(
     int[:] i_indices,
     int[:] j_indices,
@@ -286,11 +286,10 @@ class SplitMatrix(MatrixBase):
         for i in range(len(self.indices)):
             idx_i = subset_cols_indices[i]
             mat_i = self.matrices[i]
-            res = mat_i.sandwich(d, rows, subset_cols[i])
-            if isinstance(res, sps.dia_matrix):
-                out[(idx_i, idx_i)] += np.squeeze(res.data)
+            if isinstance(mat_i, CategoricalMatrix):
+                out[(idx_i, idx_i)] += mat_i._sandwich_diag(d, rows, subset_cols[i])
             else:
-                out[np.ix_(idx_i, idx_i)] = res
+                out[np.ix_(idx_i, idx_i)] = mat_i.sandwich(d, rows, subset_cols[i])
 
             for j in range(i + 1, len(self.indices)):
                 idx_j = subset_cols_indices[j]
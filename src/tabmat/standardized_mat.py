@@ -2,7 +2,9 @@ from typing import List, Union
 
 import numpy as np
 from scipy import sparse as sps
+from scipy.linalg import get_blas_funcs
 
+from .categorical_matrix import CategoricalMatrix
 from .matrix_base import MatrixBase
 from .sparse_matrix import SparseMatrix
 from .util import (
@@ -135,20 +137,30 @@ class StandardizedMatrix:
             if cols is not None:
                 cols = setup_cols
 
-        term1 = self.mat.sandwich(d, rows, cols)
+        if isinstance(self.mat, CategoricalMatrix):
+            # The sandwich product is diagonal; only keep the diagonal.
+            term1 = self.mat._sandwich_diag(d, rows, cols)
+        else:
+            term1 = self.mat.sandwich(d, rows, cols)
         d_mat = self.mat.transpose_matvec(d, rows, cols)
         if self.mult is not None:
             limited_mult = self.mult[cols] if cols is not None else self.mult
             d_mat *= limited_mult
-        term2 = np.outer(d_mat, self.shift[cols])
 
         limited_shift = self.shift[cols] if cols is not None else self.shift
         limited_d = d[rows] if rows is not None else d
-        term3_and_4 = np.outer(limited_shift, d_mat + limited_shift * limited_d.sum())
-        res = term2 + term3_and_4
-        if isinstance(term1, sps.dia_matrix):
+        # The shift terms are
+        #   outer(shift, d_mat + shift * sum(d)) + outer(d_mat, shift).
+        # Add the second one to the first as a BLAS rank-1 update, so that only
+        # one (p, p) array is allocated. res is C-ordered, so the update is
+        # applied to its Fortran-ordered transpose.
+        res = np.outer(limited_shift, d_mat + limited_shift * limited_d.sum())
+        if res.size:
+            ger = get_blas_funcs("ger", (res,))
+            res = ger(1.0, limited_shift, d_mat, a=res.T, overwrite_a=True).T
+        if term1.ndim == 1:
             idx = np.arange(res.shape[0])
-            to_add = term1.data[0, :]
+            to_add = term1
             if self.mult is not None:
                 to_add *= limited_mult ** 2
             res[idx, idx] += to_add
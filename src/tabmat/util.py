@@ -9,7 +9,11 @@ def set_up_rows_or_cols(
     """Set up rows or columns using input array and input length."""
     if arr is None:
         return np.arange(length, dtype=dtype)
-    return np.asarray(arr).astype(dtype)
+    # Only copy if needed, so that callers reusing the same index array (e.g. an
+    # active set across iterations) don't pay for a conversion on every call. The
+    # extensions read the array through a raw pointer, so it has to be contiguous,
+    # and it needs to be writeable to be accepted by typed Cython memoryviews.
+    return np.require(arr, dtype=dtype, requirements=["C", "W"])
 
 
 def setup_restrictions(
@@ -1,6 +1,7 @@
 import numpy as np
 import pandas as pd
 import pytest
+from scipy import sparse as sps
 
 from tabmat.categorical_matrix import CategoricalMatrix
 
@@ -17,6 +18,7 @@ def cat_vec():
 @pytest.mark.parametrize("drop_first", [True, False])
 def test_recover_orig(cat_vec, vec_dtype, drop_first):
     orig_recovered = CategoricalMatrix(cat_vec, drop_first=drop_first).recover_orig()
+    assert isinstance(orig_recovered, np.ndarray)
     np.testing.assert_equal(orig_recovered, cat_vec)
 
 
@@ -30,14 +32,56 @@ def test_csr_matvec_categorical(cat_vec, vec_dtype, drop_first):
     np.testing.assert_allclose(res, cat_mat.A.dot(vec))
 
 
+@pytest.mark.parametrize("cols", [None, [0, 2]])
+@pytest.mark.parametrize("drop_first", [True, False])
+def test_matvec_2d(cat_vec, drop_first, cols):
+    cat_mat = CategoricalMatrix(cat_vec, drop_first=drop_first)
+    other = np.random.random((cat_mat.shape[1], 3))
+    res = cat_mat.matvec(other, cols)
+    expected = cat_mat.A if cols is None else cat_mat.A[:, cols]
+    expected = expected.dot(other if cols is None else other[cols])
+    np.testing.assert_allclose(res, expected)
+
+
 @pytest.mark.parametrize("drop_first", [True, False])
 def test_tocsr(cat_vec, drop_first):
     cat_mat = CategoricalMatrix(cat_vec, drop_first=drop_first)
+    assert cat_mat.tocsr().indices.dtype == np.int32
     res = cat_mat.tocsr().A
     expected = pd.get_dummies(cat_vec, drop_first=drop_first)
     np.testing.assert_allclose(res, expected)
 
 
+@pytest.mark.parametrize("drop_first", [True, False])
+def test_toarray(cat_vec, drop_first):
+    cat_mat = CategoricalMatrix(cat_vec, drop_first=drop_first, dtype=np.float32)
+    res = cat_mat.toarray()
+    assert res.dtype == np.float32
+    expected = pd.get_dummies(cat_vec, drop_first=drop_first)
+    np.testing.assert_allclose(res, expected)
+
+
+@pytest.mark.parametrize("drop_first", [True, False])
+def test_tocsc(cat_vec, drop_first):
+    cat_mat = CategoricalMatrix(cat_vec, drop_first=drop_first)
+    res = cat_mat.tocsc()
+    assert res.has_sorted_indices
+    expected = pd.get_dummies(cat_vec, drop_first=drop_first)
+    np.testing.assert_allclose(res.A, expected)
+    for i in range(cat_mat.shape[1]):
+        np.testing.assert_allclose(cat_mat.getcol(i).A[:, 0], expected.iloc[:, i])
+
+
+@pytest.mark.parametrize("drop_first", [True, False])
+def test_getcol(cat_vec, drop_first):
+    cat_mat = CategoricalMatrix(cat_vec, drop_first=drop_first)
+    expected = pd.get_dummies(cat_vec, drop_first=drop_first)
+    for i in range(cat_mat.shape[1]):
+        np.testing.assert_allclose(cat_mat.getcol(i).A[:, 0], expected.iloc[:, i])
+    # A single column doesn't need the csc structure.
+    assert cat_mat.x_csc is None
+
+
 @pytest.mark.parametrize("drop_first", [True, False])
 def test_transpose_matvec(cat_vec, drop_first):
     cat_mat = CategoricalMatrix(cat_vec, drop_first=drop_first)
@@ -47,6 +91,72 @@ def test_transpose_matvec(cat_vec, drop_first):
     np.testing.assert_allclose(res, expected)
 
 
+@pytest.mark.parametrize("vec_dtype", [np.float64, np.float32, np.int64])
+@pytest.mark.parametrize("drop_first", [True, False])
+def test_transpose_matvec_vec_dtype(cat_vec, vec_dtype, drop_first):
+    cat_mat = CategoricalMatrix(cat_vec, drop_first=drop_first)
+    other = np.arange(cat_mat.shape[0], dtype=vec_dtype)
+    res = cat_mat.transpose_matvec(other)
+    assert res.dtype == cat_mat.dtype
+    expected = pd.get_dummies(cat_vec, drop_first=drop_first).T.dot(other)
+    np.testing.assert_allclose(res, expected)
+
+
+@pytest.mark.parametrize("drop_first", [True, False])
+def test_sandwich_non_contiguous_d(cat_vec, drop_first):
+    cat_mat = CategoricalMatrix(cat_vec, drop_first=drop_first)
+    d = np.random.random((cat_mat.shape[0], 3))[:, 0]
+    assert not d.flags["C_CONTIGUOUS"]
+    res = cat_mat.sandwich(d).A
+    expected = pd.get_dummies(cat_vec, drop_first=drop_first).to_numpy()
+    np.testing.assert_allclose(res, expected.T @ np.diag(d) @ expected)
+
+
+@pytest.mark.parametrize("order", ["C", "F"])
+@pytest.mark.parametrize("R_cols", [None, [2, 0]])
+@pytest.mark.parametrize("L_cols", [None, [2, 0], [1, 1], [0, 1, 0]])
+@pytest.mark.parametrize("rows", [None, [1, 4, 5, 8]])
+@pytest.mark.parametrize("drop_first", [True, False])
+def test_cross_sandwich_dense(cat_vec, drop_first, rows, L_cols, R_cols, order):
+    cat_mat = CategoricalMatrix(cat_vec, drop_first=drop_first)
+    other = np.asarray(np.random.random((cat_mat.shape[0], 3)), order=order)
+    d = np.random.random(cat_mat.shape[0])
+    res = cat_mat._cross_sandwich(other, d, rows, L_cols, R_cols)
+
+    rows = slice(None) if rows is None else rows
+    L_cols = slice(None) if L_cols is None else L_cols
+    R_cols = slice(None) if R_cols is None else R_cols
+    expected = (cat_mat.A[rows].T * d[rows]) @ other[rows]
+    np.testing.assert_allclose(res, expected[L_cols][:, R_cols])
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+@pytest.mark.parametrize("index_dtype", [np.int32, np.int64])
+@pytest.mark.parametrize("R_cols", [None, [2, 0]])
+@pytest.mark.parametrize("L_cols", [None, [2, 0], [1, 1]])
+@pytest.mark.parametrize("rows", [None, [1, 4, 5, 8], [4, 1, 4]])
+@pytest.mark.parametrize("drop_first", [True, False])
+def test_cross_sandwich_sparse(
+    cat_vec, drop_first, rows, L_cols, R_cols, index_dtype, dtype
+):
+    cat_mat = CategoricalMatrix(cat_vec, drop_first=drop_first)
+    dense = np.random.random((cat_mat.shape[0], 3)).astype(dtype)
+    dense[dense < 0.5] = 0
+    other = sps.csc_matrix(dense)
+    # scipy downcasts index arrays in the constructor, so set them directly.
+    other.indices = other.indices.astype(index_dtype)
+    other.indptr = other.indptr.astype(index_dtype)
+    d = np.random.random(cat_mat.shape[0]).astype(dtype)
+    res = cat_mat._cross_sandwich(other, d, rows, L_cols, R_cols)
+    assert res.dtype == dtype
+
+    rows = slice(None) if rows is None else rows
+    L_cols = slice(None) if L_cols is None else L_cols
+    R_cols = slice(None) if R_cols is None else R_cols
+    expected = (cat_mat.A[rows].T * d[rows]) @ dense[rows]
+    np.testing.assert_allclose(res, expected[L_cols][:, R_cols], rtol=1e-5)
+
+
 @pytest.mark.parametrize("drop_first", [True, False])
 def test_multiply(cat_vec, drop_first):
     cat_mat = CategoricalMatrix(cat_vec, drop_first=drop_first)
@@ -58,6 +168,44 @@ def test_multiply(cat_vec, drop_first):
     np.testing.assert_allclose(res2.A, expected)
 
 
+@pytest.mark.parametrize("drop_first", [True, False])
+def test_from_codes(drop_first):
+    categories = ["a", "b", "c"]
+    codes = np.array([1, 0, 2, 1], dtype=np.int8)
+    cat_mat = CategoricalMatrix(codes, drop_first=drop_first, categories=categories)
+    expected = CategoricalMatrix(np.asarray(categories)[codes], drop_first=drop_first)
+    np.testing.assert_equal(cat_mat.recover_orig(), expected.recover_orig())
+    np.testing.assert_allclose(cat_mat.A, expected.A)
+
+
+def test_from_codes_raises():
+    with pytest.raises(ValueError, match="must contain integer codes"):
+        CategoricalMatrix(["a", "b"], categories=["a", "b"])
+    with pytest.raises(ValueError, match="can't have missing values"):
+        CategoricalMatrix([0, -1], categories=["a", "b"])
+
+
+@pytest.mark.parametrize("copy", [True, False])
+def test_astype(cat_vec, copy):
+    cat_mat = CategoricalMatrix(cat_vec)
+    new_mat = cat_mat.astype(np.float32, copy=copy)
+    assert new_mat.dtype == np.float32
+    assert new_mat.indices is cat_mat.indices
+    if copy:
+        assert cat_mat.dtype == np.float64
+    else:
+        assert new_mat is cat_mat
+
+
+def test_astype_subclass(cat_vec):
+    class MyCategoricalMatrix(CategoricalMatrix):
+        pass
+
+    new_mat = MyCategoricalMatrix(cat_vec).astype(np.float32)
+    assert type(new_mat) is MyCategoricalMatrix
+    assert new_mat.dtype == np.float32
+
+
 @pytest.mark.parametrize("mi_element", [np.nan, None])
 def test_nulls(mi_element):
     vec = [0, mi_element, 1]
@@ -71,3 +219,30 @@ def test_categorical_indexing(drop_first):
     mat = CategoricalMatrix(catvec, drop_first=drop_first)
     expected = pd.get_dummies(catvec, drop_first=drop_first).to_numpy()[:, [0, 1]]
     np.testing.assert_allclose(mat[:, [0, 1]].A, expected)
+
+
+@pytest.mark.parametrize("drop_first", [True, False])
+@pytest.mark.parametrize("row", [1, [0, 3, 4], slice(None, None, 2)])
+def test_categorical_row_indexing(drop_first, row):
+    catvec = [0, 1, 2, 0, 1, 2, 0, 1, 2, 3, 3]
+    mat = CategoricalMatrix(catvec, drop_first=drop_first)
+    expected = pd.get_dummies(catvec, drop_first=drop_first).to_numpy()
+    expected = expected[[row] if isinstance(row, int) else row]
+    res = mat[row]
+    assert isinstance(res, CategoricalMatrix)
+    np.testing.assert_allclose(res.A, expected)
+    np.testing.assert_allclose(
+        res.transpose_matvec(np.ones(res.shape[0])), expected.sum(axis=0)
+    )
+
+
+def test_categorical_row_indexing_subclass():
+    class MyCategoricalMatrix(CategoricalMatrix):
+        pass
+
+    catvec = [0, 1, 2, 0, 1, 2]
+    mat = MyCategoricalMatrix(catvec)
+    res = mat[np.array([True, False, True, True, False, False])]
+    assert type(res) is MyCategoricalMatrix
+    assert res.indices.dtype == np.int32
+    np.testing.assert_equal(res.recover_orig(), [0, 2, 0])
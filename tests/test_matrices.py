@@ -222,38 +222,17 @@ def test_matvec(
     other_as_list = np.random.random(shape).tolist()
     other = other_type(other_as_list)
 
-    def is_split_with_cat_part(x):
-        return isinstance(x, tm.SplitMatrix) and any(
-            isinstance(elt, tm.CategoricalMatrix) for elt in x.matrices
-        )
-
-    has_categorical_component = (
-        isinstance(mat, tm.CategoricalMatrix)
-        or is_split_with_cat_part(mat)
-        or (
-            isinstance(mat, tm.StandardizedMatrix)
-            and (
-                isinstance(mat.mat, tm.CategoricalMatrix)
-                or is_split_with_cat_part(mat.mat)
-            )
-        )
-    )
-
-    if has_categorical_component and len(shape) > 1:
-        with pytest.raises(NotImplementedError, match="only implemented for 1d"):
-            mat.matvec(other, cols)
-    else:
-        res = mat.matvec(other, cols)
+    res = mat.matvec(other, cols)
 
-        mat_subset, vec_subset = process_mat_vec_subsets(mat, other, None, cols, cols)
-        expected = mat_subset.dot(vec_subset)
+    mat_subset, vec_subset = process_mat_vec_subsets(mat, other, None, cols, cols)
+    expected = mat_subset.dot(vec_subset)
 
-        np.testing.assert_allclose(res, expected)
-        assert isinstance(res, np.ndarray)
+    np.testing.assert_allclose(res, expected)
+    assert isinstance(res, np.ndarray)
 
-        if cols is None:
-            res2 = mat @ other
-            np.testing.assert_allclose(res2, expected)
+    if cols is None:
+        res2 = mat @ other
+        np.testing.assert_allclose(res2, expected)
 
 
 def process_mat_vec_subsets(mat, vec, mat_rows, mat_cols, vec_idxs):
@@ -378,6 +357,39 @@ def test_split_sandwich(rows: Optional[np.ndarray], cols: Optional[np.ndarray]):
     np.testing.assert_almost_equal(result, expected)
 
 
+def strided_index_matrices() -> List[tm.MatrixBase]:
+    rng = np.random.default_rng(0)
+    dense = rng.standard_normal((20, 6))
+    dense[dense < 0] = 0
+    cat = tm.CategoricalMatrix(rng.integers(0, 6, 20))
+    return [
+        tm.DenseMatrix(dense),
+        tm.DenseMatrix(np.asfortranarray(dense)),
+        tm.SparseMatrix(sps.csc_matrix(dense)),
+        cat,
+        tm.SplitMatrix([tm.DenseMatrix(dense), cat]),
+    ]
+
+
+@pytest.mark.parametrize("mat", strided_index_matrices())
+def test_strided_rows_cols(mat: tm.MatrixBase):
+    # Non-contiguous int32 views must not be passed through to the extensions,
+    # which read them as contiguous arrays.
+    rows = np.arange(mat.shape[0], dtype=np.int32)[::2]
+    cols = np.arange(mat.shape[1], dtype=np.int32)[::2]
+    d = np.random.default_rng(1).random(mat.shape[0])
+    v = np.random.default_rng(2).random(mat.shape[1])
+    mat_as_dense = mat.A
+
+    res = mat.sandwich(d, rows, cols)
+    if sps.issparse(res):
+        res = res.A
+    sub = mat_as_dense[np.ix_(rows, cols)]
+    np.testing.assert_allclose(res, sub.T @ np.diag(d[rows]) @ sub)
+    np.testing.assert_allclose(mat.matvec(v, cols), mat_as_dense[:, cols] @ v[cols])
+    np.testing.assert_allclose(mat.transpose_matvec(d, rows, cols), sub.T @ d[rows])
+
+
 @pytest.mark.parametrize(
     "mat",
     [